@@ -0,0 +1,292 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Column layout of a change record, see build_change_record in IfcDiff
+COLUMNS = ("GlobalId", "ChangeType", "IfcClass", "OldReference", "NewReference", "User", "Timestamp")
+COLUMN_WIDTHS = (190, 80, 170, 110, 110, 110, 140)
+
+# Columns that get a drop-down filter in the toolbar
+FILTER_COLUMNS = ("ChangeType", "User", "IfcClass")
+
+# Columns matched by the incremental search box
+SEARCH_COLUMNS = (0, 3, 4)
+
+# Joins the searched columns of a record; cannot be typed into the search box
+SEARCH_SEPARATOR = "\n"
+
+ALL_VALUES = "All"
+SEARCH_DELAY_MS = 250
+
+
+def search_key(record):
+    """Lowercases the searched columns of a record once, when it is added."""
+    return SEARCH_SEPARATOR.join(record[column] for column in SEARCH_COLUMNS).lower()
+
+
+def insertion_point(indices, value, key, reverse, lo=0):
+    """Position after any equal keys at which value keeps indices sorted."""
+    hi = len(indices)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        current = key(indices[mid])
+        if (current < value) if reverse else (value < current):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def merge_sorted(indices, new_indices, key, reverse=False):
+    """Merges sorted new_indices into sorted indices.
+
+    Only the new indices are compared, by binary search; the existing list
+    is copied in slices. New rows go after existing rows with an equal key,
+    the same place a stable re-sort would put them.
+    """
+    if not new_indices:
+        return indices
+    merged = []
+    start = 0
+    for index in new_indices:
+        position = insertion_point(indices, key(index), key, reverse, start)
+        merged.extend(indices[start:position])
+        merged.append(index)
+        start = position
+    merged.extend(indices[start:])
+    return merged
+
+
+class ChangeTableView(ttk.Frame):
+    """A virtualized table of change records.
+
+    Only the rows that fit in the visible window are ever inserted into the
+    Treeview. Scrolling, sorting and filtering work on a list of record
+    indices and simply re-fill the visible rows, so the widget stays
+    responsive with millions of records.
+    """
+
+    def __init__(self, parent, page_size=15):
+        super().__init__(parent)
+        self.page_size = page_size
+
+        self.records = []
+        self.search_keys = []    # lowercased searched columns, one string per record
+        self.order = []          # record indices in current sort order
+        self.view = []           # record indices after filtering
+        self.offset = 0          # index into self.view of the first visible row
+        self.sort_column = None
+        self.sort_reverse = False
+        self.last_search = ""
+        self.search_job = None
+
+        self.filter_vars = {name: tk.StringVar(value=ALL_VALUES) for name in FILTER_COLUMNS}
+        self.search_var = tk.StringVar()
+        self.count_var = tk.StringVar(value="0 rows")
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        # Filter bar
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill="x", pady=(0, 5))
+
+        self.filter_boxes = {}
+        for name in FILTER_COLUMNS:
+            ttk.Label(filter_frame, text=f"{name}:").pack(side="left", padx=(5, 2))
+            box = ttk.Combobox(filter_frame, textvariable=self.filter_vars[name],
+                               values=[ALL_VALUES], state="readonly", width=14)
+            box.pack(side="left", padx=(0, 5))
+            box.bind("<<ComboboxSelected>>", lambda event: self.apply_filters())
+            self.filter_boxes[name] = box
+
+        ttk.Label(filter_frame, text="Search:").pack(side="left", padx=(5, 2))
+        ttk.Entry(filter_frame, textvariable=self.search_var, width=20).pack(side="left")
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        ttk.Label(filter_frame, textvariable=self.count_var).pack(side="right", padx=5)
+
+        # Table with a scrollbar that is driven by self.offset, not by the Treeview
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill="both", expand=True)
+
+        self.tree = ttk.Treeview(table_frame, columns=COLUMNS, show="headings",
+                                 height=self.page_size, selectmode="browse")
+        for name, width in zip(COLUMNS, COLUMN_WIDTHS):
+            self.tree.heading(name, text=name, command=lambda col=name: self.sort_by(col))
+            self.tree.column(name, width=width, stretch=True, anchor="w")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_mousewheel)
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.page_size))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.page_size))
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0))
+        self.tree.bind("<End>", lambda event: self.scroll_to(len(self.view)))
+        self.tree.bind("<Configure>", self.on_resize)
+
+    def set_records(self, records):
+        """Replaces the table contents with a new list of change records."""
+        self.records = list(records)
+        self.search_keys = [search_key(record) for record in self.records]
+        self.order = list(range(len(records)))
+        self.sort_column = None
+        self.sort_reverse = False
+        self.last_search = ""
+
+        for name in FILTER_COLUMNS:
+            column = COLUMNS.index(name)
+            values = sorted({record[column] for record in records})
+            self.filter_boxes[name].configure(values=[ALL_VALUES] + values)
+            self.filter_vars[name].set(ALL_VALUES)
+
+        for name in COLUMNS:
+            self.tree.heading(name, text=name)
+
+        self.apply_filters()
+
+    def append_records(self, records):
+        """Adds records to the end of the table, e.g. as an analysis streams them in.
+
+        Only the new records are filtered; the current scroll position is kept.
+        """
+        if not records:
+            return
+        start = len(self.records)
+        self.records.extend(records)
+        self.search_keys.extend(search_key(record) for record in records)
+        new_indices = range(start, len(self.records))
+
+        for name in FILTER_COLUMNS:
+            column = COLUMNS.index(name)
+            known = set(self.filter_boxes[name].cget("values"))
+            added = {record[column] for record in records} - known
+            if added:
+                values = sorted((known - {ALL_VALUES}) | added)
+                self.filter_boxes[name].configure(values=[ALL_VALUES] + values)
+
+        if self.sort_column is not None:
+            # Sort only the new chunk and merge it in, instead of re-sorting everything
+            records = self.records
+            column = self.sort_column
+            key = lambda i: records[i][column]
+            new_indices = sorted(new_indices, key=key, reverse=self.sort_reverse)
+            self.order = merge_sorted(self.order, new_indices, key, self.sort_reverse)
+            self.view = merge_sorted(self.view, self.matching(new_indices, self.last_search),
+                                     key, self.sort_reverse)
+        else:
+            self.order.extend(new_indices)
+            self.view.extend(self.matching(new_indices, self.last_search))
+        self.render()
+
+    def sort_by(self, name):
+        """Sorts all records by a column, toggling the direction on repeated clicks."""
+        column = COLUMNS.index(name)
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+
+        records = self.records
+        self.order.sort(key=lambda i: records[i][column], reverse=self.sort_reverse)
+
+        arrow = " ▼" if self.sort_reverse else " ▲"
+        for other in COLUMNS:
+            self.tree.heading(other, text=other + (arrow if other == name else ""))
+
+        self.apply_filters()
+
+    def schedule_search(self):
+        """Debounces the search box so typing does not re-filter on every key."""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        text = self.search_var.get().strip().lower()
+
+        # Narrowing an existing search only needs to look at the rows still shown
+        if self.last_search and text.startswith(self.last_search):
+            self.view = self.filter_indices(self.view, text)
+            self.last_search = text
+            self.offset = 0
+            self.render()
+        else:
+            self.apply_filters()
+
+    def apply_filters(self):
+        """Rebuilds the filtered view from the sorted record order."""
+        text = self.search_var.get().strip().lower()
+        self.view = self.matching(self.order, text)
+        self.last_search = text
+        self.offset = 0
+        self.render()
+
+    def matching(self, indices, text):
+        """Returns the indices that pass the drop-down filters and the search text."""
+        records = self.records
+        for name in FILTER_COLUMNS:
+            value = self.filter_vars[name].get()
+            if value != ALL_VALUES:
+                column = COLUMNS.index(name)
+                indices = [i for i in indices if records[i][column] == value]
+        return self.filter_indices(indices, text)
+
+    def filter_indices(self, indices, text):
+        if not text:
+            return list(indices)
+        search_keys = self.search_keys
+        return [i for i in indices if text in search_keys[i]]
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.view)))
+        elif action == "scroll":
+            step = self.page_size if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def on_resize(self, event):
+        # Work out how many rows fit now that the window has been resized
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or 20
+        page_size = max(1, int(event.height) // int(row_height) - 1)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.tree.configure(height=page_size)
+            self.scroll_to(self.offset)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.view) - self.page_size))
+        if offset != self.offset or not self.tree.get_children():
+            self.offset = offset
+            self.render()
+        return "break"
+
+    def render(self):
+        """Fills the visible Treeview rows from the current window of the view."""
+        rows = self.view[self.offset:self.offset + self.page_size]
+        items = self.tree.get_children()
+
+        # Reuse existing items and only add or remove the difference
+        for item, index in zip(items, rows):
+            self.tree.item(item, values=self.records[index])
+        for index in rows[len(items):]:
+            self.tree.insert("", "end", values=self.records[index])
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+
+        total = len(self.view)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_var.set(f"{total:,} of {len(self.records):,} rows")
@@ -0,0 +1,83 @@
+import ifcopenshell
+import gzip
+import os
+import zipfile
+
+# Chunk size used when streaming decompressed data into memory
+CHUNK_SIZE = 1024 * 1024
+
+def is_gzip_path(file_path):
+    return file_path.lower().endswith(".gz")
+
+def is_ifczip_path(file_path):
+    return file_path.lower().endswith(".ifczip")
+
+def is_compressed_path(file_path):
+    """Returns True if the path points to an .ifczip or gzip compressed file."""
+    return is_gzip_path(file_path) or is_ifczip_path(file_path)
+
+def open_compressed_stream(file_path):
+    """Opens a binary stream that decompresses the IFC data on the fly."""
+    if is_gzip_path(file_path):
+        return gzip.open(file_path, "rb")
+
+    archive = zipfile.ZipFile(file_path)
+    members = [name for name in archive.namelist() if name.lower().endswith(".ifc")]
+    if not members:
+        archive.close()
+        raise ValueError(f"No .ifc file found inside '{file_path}'")
+    # The stream keeps the archive open until it is closed itself
+    return archive.open(members[0])
+
+def read_compressed_text(file_path):
+    """Decompresses a file straight into memory, no temp file.
+
+    Chunks are appended to a single buffer, which is freed once decoded,
+    so only one copy of the model text is alive next to the parser's own.
+    """
+    buffer = bytearray()
+    with open_compressed_stream(file_path) as stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+    return buffer.decode("utf-8", errors="replace")
+
+def open_ifc_model(file_path):
+    """Opens a plain, .ifczip or .ifc.gz file and returns the model instance."""
+    if not is_compressed_path(file_path):
+        return ifcopenshell.open(file_path)
+    return ifcopenshell.file.from_string(read_compressed_text(file_path))
+
+def write_ifc_model(ifc_file, output_path, compress=False):
+    """Writes a model, compressing it if asked to or if the path says so.
+
+    Plain .ifc paths are turned into .ifczip when compress is set.
+    Returns the path that was actually written.
+    """
+    if compress and not is_compressed_path(output_path):
+        output_path += "zip" if output_path.lower().endswith(".ifc") else ".gz"
+
+    if is_gzip_path(output_path):
+        with gzip.open(output_path, "wt", encoding="utf-8") as file:
+            file.write(ifc_file.to_string())
+    elif is_ifczip_path(output_path):
+        member = os.path.splitext(os.path.basename(output_path))[0] + ".ifc"
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(member, ifc_file.to_string())
+    else:
+        ifc_file.write(output_path)
+    return output_path
+
+def report_filename(filename, compress=False):
+    """Returns the on-disk name of a report, adding .gz when compressing."""
+    if compress and not is_gzip_path(filename):
+        return filename + ".gz"
+    return filename
+
+def open_report(filename, compress=False):
+    """Opens a text report for writing, gzip compressed if asked to."""
+    if compress or is_gzip_path(filename):
+        return gzip.open(report_filename(filename, True), "wt", newline="", encoding="utf-8")
+    return open(filename, "w", newline="")
@@ -0,0 +1,311 @@
+import ifcopenshell
+import hashlib
+import io
+import re
+import tempfile
+from CompressedIO import is_compressed_path, open_compressed_stream
+from SortedRuns import DEFAULT_MEMORY_LIMIT_MB, SortedSpool
+from IfcDiff import ChangeReportWriter, ElementRecord
+
+ENTITY_PATTERN = re.compile(r"#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\((.*)\)\s*;\s*$", re.DOTALL)
+SCHEMA_PATTERN = re.compile(r"FILE_SCHEMA\s*\(\s*\(\s*'([^']+)'", re.IGNORECASE)
+REFERENCE_PATTERN = re.compile(r"#\d+")
+ENTITY_ID_PATTERN = re.compile(r"#(\d+)")
+# Quoted strings are skipped whole so their commas and brackets are ignored
+ARGUMENT_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|[(),]")
+TYPED_VALUE_PATTERN = re.compile(r"[A-Za-z0-9_]+\((.*)\)$", re.DOTALL)
+
+# The property compared by get_modified_elements, as written in STEP
+REFERENCE_PSET = "'Pset_BuildingElementProxyCommon'"
+REFERENCE_PROPERTY = "'Reference'"
+
+# Spools that share one memory budget: while a file is scanned, its four
+# scan spools are alive next to the other model's GlobalId-sorted records
+SCAN_SPOOLS = 4
+DIFF_SPOOLS = SCAN_SPOOLS + 1
+# The report writer's timeline and element spools fill during the merge-join
+REPORT_SPOOLS = 2
+
+
+def open_step_text(file_path):
+    """Opens a plain or compressed IFC file as a text stream."""
+    if is_compressed_path(file_path):
+        return io.TextIOWrapper(open_compressed_stream(file_path), encoding="utf-8", errors="replace")
+    return open(file_path, "r", encoding="utf-8", errors="replace")
+
+
+def iter_step_statements(stream):
+    """Yields complete STEP statements, joining ones that span several lines."""
+    buffer = []
+    for line in stream:
+        buffer.append(line)
+        stripped = line.rstrip()
+        # A statement is complete at a ';' that is not inside a quoted string
+        if stripped.endswith(";") and "".join(buffer).count("'") % 2 == 0:
+            yield "".join(buffer).strip()
+            buffer = []
+
+
+class ElementTypeFilter:
+    """Answers 'is this STEP type an IfcElement?' from the schema, with a cache."""
+
+    def __init__(self, schema_name):
+        self.schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name)
+        self.cache = {}
+
+    def __call__(self, type_name):
+        if type_name not in self.cache:
+            self.cache[type_name] = self.lookup(type_name)
+        return self.cache[type_name]
+
+    def lookup(self, type_name):
+        try:
+            declaration = self.schema.declaration_by_name(type_name)
+        except Exception:
+            return None
+        ifc_class = declaration.name()
+        while declaration is not None:
+            if declaration.name() == "IfcElement":
+                return ifc_class
+            declaration = declaration.supertype()
+        return None
+
+
+def fingerprint_arguments(arguments):
+    """Hashes an entity's attributes after GlobalId and OwnerHistory.
+
+    Entity references are blanked out so that instance renumbering between
+    two exports does not show up as a modification.
+    """
+    parts = arguments.split(",", 2)
+    rest = parts[2] if len(parts) == 3 else ""
+    rest = REFERENCE_PATTERN.sub("#", rest)
+    return hashlib.blake2b(rest.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def split_arguments(arguments):
+    """Splits a STEP argument list at its top-level commas."""
+    parts = []
+    depth = 0
+    start = 0
+    for token in ARGUMENT_TOKEN_PATTERN.finditer(arguments):
+        char = token.group()
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(arguments[start:token.start()].strip())
+            start = token.end()
+    parts.append(arguments[start:].strip())
+    return parts
+
+
+def property_value(argument):
+    """Turns a nominal value such as IFCLABEL('R2') into the plain 'R2'."""
+    match = TYPED_VALUE_PATTERN.match(argument)
+    if match:
+        argument = match.group(1).strip()
+    if argument == "$":
+        return ""
+    if len(argument) >= 2 and argument[0] == argument[-1] == "'":
+        argument = argument[1:-1].replace("''", "'")
+    # Spooled records are tab separated lines
+    return argument.replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def scan_model(file_path, spool_limit_mb, work_dir):
+    """Streams a file once and spools the records needed to diff it.
+
+    Returns four spools, each sorted on its first field:
+    elements (entity id, GlobalId, IfcClass, fingerprint),
+    values (property id, Reference value),
+    members (property id, pset id) of the Reference property set, and
+    relations (pset id, element id) from IfcRelDefinesByProperties.
+    """
+    elements = SortedSpool(spool_limit_mb, work_dir)
+    values = SortedSpool(spool_limit_mb, work_dir)
+    members = SortedSpool(spool_limit_mb, work_dir)
+    relations = SortedSpool(spool_limit_mb, work_dir)
+
+    with open_step_text(file_path) as stream:
+        statements = iter_step_statements(stream)
+
+        schema_name = "IFC4"
+        for statement in statements:
+            match = SCHEMA_PATTERN.search(statement)
+            if match:
+                schema_name = match.group(1)
+            if statement.upper() == "DATA;":
+                break
+
+        is_element = ElementTypeFilter(schema_name)
+        for statement in statements:
+            match = ENTITY_PATTERN.match(statement)
+            if not match:
+                continue
+            entity_id, type_name, arguments = match.groups()
+            type_name = type_name.upper()
+
+            if type_name == "IFCPROPERTYSINGLEVALUE":
+                if arguments.startswith(REFERENCE_PROPERTY):
+                    values.add((entity_id, property_value(split_arguments(arguments)[2])))
+            elif type_name == "IFCPROPERTYSET":
+                if REFERENCE_PSET in arguments:
+                    parts = split_arguments(arguments)
+                    if parts[2] == REFERENCE_PSET:
+                        for property_id in ENTITY_ID_PATTERN.findall(parts[4]):
+                            members.add((property_id, entity_id))
+            elif type_name == "IFCRELDEFINESBYPROPERTIES":
+                parts = split_arguments(arguments)
+                for pset_id in ENTITY_ID_PATTERN.findall(parts[5]):
+                    for element_id in ENTITY_ID_PATTERN.findall(parts[4]):
+                        relations.add((pset_id, element_id))
+            else:
+                ifc_class = is_element(type_name)
+                if ifc_class is None or not arguments.startswith("'"):
+                    continue
+                global_id = arguments[1:arguments.index("'", 1)]
+                elements.add((entity_id, global_id, ifc_class, fingerprint_arguments(arguments)))
+
+    return elements, values, members, relations
+
+
+def join_first(left, right):
+    """Inner join of two streams sorted on their first field.
+
+    Yields (left_record, right_record) for each right record; when several
+    left records share a key only the first one is used.
+    """
+    left = iter(left)
+    left_record = next(left, None)
+    for right_record in right:
+        key = right_record[0]
+        while left_record is not None and left_record[0] < key:
+            left_record = next(left, None)
+        if left_record is None:
+            return
+        if left_record[0] == key:
+            yield left_record, right_record
+
+
+def iter_element_records(file_path, spool_limit_mb, work_dir):
+    """Yields (GlobalId, IfcClass, fingerprint, Reference) sorted by GlobalId.
+
+    The Reference value is resolved from entity ids with external
+    sort-merge joins: property -> property set -> IfcRelDefinesByProperties
+    -> element. Only occurrence property sets are followed, not ones
+    inherited from the element type.
+    """
+    elements, values, members, relations = scan_model(file_path, spool_limit_mb, work_dir)
+
+    pset_values = SortedSpool(spool_limit_mb, work_dir)
+    for (_, value), (_, pset_id) in join_first(values, members):
+        pset_values.add((pset_id, value))
+    values.close()
+    members.close()
+
+    element_values = SortedSpool(spool_limit_mb, work_dir)
+    for (_, value), (_, element_id) in join_first(pset_values, relations):
+        element_values.add((element_id, value))
+    pset_values.close()
+    relations.close()
+
+    # Left join: elements without the property keep an empty Reference
+    by_guid = SortedSpool(spool_limit_mb, work_dir)
+    element_values_iter = iter(element_values)
+    current = next(element_values_iter, None)
+    for entity_id, global_id, ifc_class, fingerprint in elements:
+        while current is not None and current[0] < entity_id:
+            current = next(element_values_iter, None)
+        reference = current[1] if current is not None and current[0] == entity_id else ""
+        by_guid.add((global_id, ifc_class, fingerprint, reference))
+    elements.close()
+    element_values.close()
+
+    try:
+        yield from by_guid
+    finally:
+        by_guid.close()
+
+
+def unique_records(records):
+    """Drops records whose GlobalId repeats the previous one."""
+    last_id = None
+    for record in records:
+        if record[0] != last_id:
+            last_id = record[0]
+            yield record
+
+
+def merge_join(old_records, new_records):
+    """Walks two GlobalId-sorted streams and yields the differences.
+
+    Yields (change_type, ElementRecord, old_reference, new_reference).
+    'Modified' means the Reference changed, as in get_modified_elements.
+    An element whose own attributes changed but whose Reference did not is
+    reported as 'AttributesModified', with empty reference columns.
+    """
+    old_record = next(old_records, None)
+    new_record = next(new_records, None)
+
+    while old_record is not None or new_record is not None:
+        if new_record is None or (old_record is not None and old_record[0] < new_record[0]):
+            yield "Deleted", ElementRecord(old_record[0], old_record[1]), None, None
+            old_record = next(old_records, None)
+        elif old_record is None or new_record[0] < old_record[0]:
+            yield "Added", ElementRecord(new_record[0], new_record[1]), None, None
+            new_record = next(new_records, None)
+        else:
+            element = ElementRecord(new_record[0], new_record[1])
+            if old_record[3] != new_record[3]:
+                yield "Modified", element, old_record[3], new_record[3]
+            elif old_record[2] != new_record[2]:
+                yield "AttributesModified", element, None, None
+            old_record = next(old_records, None)
+            new_record = next(new_records, None)
+
+
+def external_diff(old_ifc_path, new_ifc_path, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, temp_dir=None):
+    """Diffs two IFC files without loading either model into memory.
+
+    Each model is streamed into on-disk spools, joined by entity id to
+    resolve each element's Reference and re-sorted by GlobalId, then both
+    sides are merge-joined. memory_limit_mb is shared by every spool that
+    is alive at the same time, so peak memory is bounded by it regardless
+    of model size.
+    """
+    spool_limit_mb = memory_limit_mb / DIFF_SPOOLS
+    with tempfile.TemporaryDirectory(dir=temp_dir) as work_dir:
+        old_records = iter_element_records(old_ifc_path, spool_limit_mb, work_dir)
+        new_records = iter_element_records(new_ifc_path, spool_limit_mb, work_dir)
+        try:
+            yield from merge_join(unique_records(old_records), unique_records(new_records))
+        finally:
+            old_records.close()
+            new_records.close()
+
+
+def save_external_diff_to_csv(old_ifc_path, new_ifc_path, filename=None,
+                              memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, compress=False):
+    """Runs an external diff and writes the same reports as save_ifc_changes_to_csv.
+
+    The change log's reference columns hold the old and new Reference values.
+    Reports are written as the merge-join finds changes, so memory stays
+    bounded by memory_limit_mb. Returns a Counter of changes per change type.
+    """
+    # One budget for the diff and the report writer's spools together
+    share_mb = memory_limit_mb / (DIFF_SPOOLS + REPORT_SPOOLS)
+    with ChangeReportWriter(filename, compress, share_mb * REPORT_SPOOLS) as report:
+        changes = external_diff(old_ifc_path, new_ifc_path, share_mb * DIFF_SPOOLS)
+        for change_type, el, old_ref, new_ref in changes:
+            report.write(change_type, el, old_ref, new_ref)
+
+    return report.counts
+
+
+if __name__ == "__main__":
+    counts = save_external_diff_to_csv("HA_oldVersion.ifc", "HA_newVersion.ifc", memory_limit_mb=64)
+    print(f"Added Elements: {counts['Added']}")
+    print(f"Deleted Elements: {counts['Deleted']}")
+    print(f"Modified Elements: {counts['Modified']}")
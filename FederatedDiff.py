@@ -0,0 +1,162 @@
+import csv
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from CompressedIO import open_report, report_filename
+from GuidIndex import GuidIndex
+from IfcDiff import (
+    ChangeReportWriter,
+    ElementRecord,
+    open_ifc_file,
+    get_added_elements,
+    get_deleted_elements,
+    get_modified_elements,
+    get_reference_value,
+)
+
+def diff_discipline(name, old_ifc_path, new_ifc_path):
+    """Diffs one discipline model pair; runs in a worker process.
+
+    Returns plain tuples only, since IFC entities cannot be pickled. Added
+    and deleted elements carry their Reference so that elements moved
+    between models can still be compared.
+    """
+    old_ifc = open_ifc_file(old_ifc_path)
+    new_ifc = open_ifc_file(new_ifc_path)
+    if not old_ifc or not new_ifc:
+        raise ValueError(f"Failed to load IFC files for '{name}'")
+
+    old_index = GuidIndex.from_model(old_ifc)
+    new_index = GuidIndex.from_model(new_ifc)
+
+    return {
+        "name": name,
+        "added": [
+            (el.GlobalId, el.is_a(), get_reference_value(el))
+            for el in get_added_elements(old_ifc, new_ifc, old_index, new_index)
+        ],
+        "deleted": [
+            (el.GlobalId, el.is_a(), get_reference_value(el))
+            for el in get_deleted_elements(old_ifc, new_ifc, old_index, new_index)
+        ],
+        "modified": [
+            (el.GlobalId, el.is_a(), old_ref, new_ref)
+            for el, old_ref, new_ref in get_modified_elements(old_ifc, new_ifc, old_index, new_index)
+        ],
+    }
+
+def find_moved_elements(results):
+    """Matches GlobalIds deleted from one discipline and added to another.
+
+    Returns {GlobalId: (old model, new model, IfcClass)} and removes the matched
+    GlobalIds from each model's added and deleted lists. A moved element whose
+    Reference changed is also listed as modified in the model it moved to.
+    Model names must be unique.
+    """
+    deleted_in = {}
+    for result in results:
+        for gid, _, reference in result["deleted"]:
+            deleted_in[gid] = (result["name"], reference)
+
+    moved = {}
+    for result in results:
+        for gid, ifc_class, new_reference in result["added"]:
+            source, old_reference = deleted_in.get(gid, (None, None))
+            if source is not None and source != result["name"]:
+                moved[gid] = (source, result["name"], ifc_class)
+                if old_reference != new_reference:
+                    result["modified"].append((gid, ifc_class, old_reference, new_reference))
+
+    moved_in = Counter(new_model for _, new_model, _ in moved.values())
+    moved_out = Counter(old_model for old_model, _, _ in moved.values())
+    for result in results:
+        result["added"] = [row for row in result["added"] if row[0] not in moved]
+        result["deleted"] = [row for row in result["deleted"] if row[0] not in moved]
+        result["moved_in"] = moved_in[result["name"]]
+        result["moved_out"] = moved_out[result["name"]]
+
+    return moved
+
+def federated_diff(model_pairs, max_workers=None):
+    """Diffs several discipline models concurrently.
+
+    model_pairs is a list of (name, old_ifc_path, new_ifc_path). Returns the
+    per-model results, in input order, and the elements that moved between models.
+    """
+    if not model_pairs:
+        return [], {}
+    names = [name for name, _, _ in model_pairs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate model names: {', '.join(duplicates)}")
+
+    workers = max_workers or min(len(model_pairs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(diff_discipline, *pair) for pair in model_pairs]
+        results = [future.result() for future in futures]
+
+    moved = find_moved_elements(results)
+    return results, moved
+
+def save_federated_changes_to_csv(results, moved, filename=None, compress=False):
+    """Saves one consolidated change log plus a per-model breakdown.
+
+    Rows are written through ChangeReportWriter with the model and IFC class
+    as leading columns, so the summaries are the same as for a single model.
+    """
+    if filename is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"federated_changes_{timestamp}.csv"
+
+    with ChangeReportWriter(filename, compress, extra_columns=("Model", "IfcClass")) as report:
+        for result in results:
+            model = result["name"]
+            for gid, ifc_class, _ in result["added"]:
+                report.write("Added", ElementRecord(gid, ifc_class), extra=(model, ifc_class))
+            for gid, ifc_class, _ in result["deleted"]:
+                report.write("Deleted", ElementRecord(gid, ifc_class), extra=(model, ifc_class))
+            for gid, ifc_class, old_ref, new_ref in result["modified"]:
+                report.write("Modified", ElementRecord(gid, ifc_class), old_ref, new_ref, extra=(model, ifc_class))
+
+        # The reference columns hold the models the element moved between
+        for gid, (old_model, new_model, ifc_class) in moved.items():
+            report.write("MovedBetweenModels", ElementRecord(gid, ifc_class), old_model, new_model,
+                         extra=(new_model, ifc_class))
+
+    save_model_breakdown(results, compress=compress)
+
+def save_model_breakdown(results, filename="model_changes_summary.csv", compress=False):
+    """Saves the number of changes per discipline model."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(["Model", "Added", "Deleted", "Modified", "Moved In", "Moved Out"])
+        for result in results:
+            writer.writerow([
+                result["name"],
+                len(result["added"]),
+                len(result["deleted"]),
+                len(result["modified"]),
+                result["moved_in"],
+                result["moved_out"],
+            ])
+
+    print(f"Model breakdown saved as {report_filename(filename, compress)}")
+
+def main():
+    model_pairs = [
+        ("Architecture", "ARC_oldVersion.ifc", "ARC_newVersion.ifc"),
+        ("Structure", "STR_oldVersion.ifc", "STR_newVersion.ifc"),
+        ("MEP", "MEP_oldVersion.ifc", "MEP_newVersion.ifc"),
+    ]
+
+    results, moved = federated_diff(model_pairs)
+    for result in results:
+        print(f"{result['name']}: {len(result['added'])} added, {len(result['deleted'])} deleted, "
+              f"{len(result['modified'])} modified")
+    print(f"Moved between models: {len(moved)}")
+
+    save_federated_changes_to_csv(results, moved)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import ifcopenshell
+import ifcopenshell.geom
+import ifcopenshell.util.shape
+import hashlib
+import json
+import multiprocessing
+import struct
+import numpy as np
+
+# IFC is Z-up, glTF is Y-up: rotate the whole overlay -90 degrees about X
+Z_UP_TO_Y_UP = [-0.7071067811865476, 0.0, 0.0, 0.7071067811865476]
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+JSON_CHUNK = 0x4E4F534A  # "JSON"
+BIN_CHUNK = 0x004E4942   # "BIN\0"
+
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+
+class GlbBuilder:
+    """Accumulates meshes, instances and binary data for a single GLB file."""
+
+    def __init__(self, colors):
+        self.colors = colors
+        self.buffer = bytearray()
+        self.buffer_views = []
+        self.accessors = []
+        self.meshes = []
+        self.nodes = []
+        self.materials = []
+        self.material_index = {}
+        self.mesh_index = {}
+
+    def add_material(self, change_type):
+        if change_type not in self.material_index:
+            red, green, blue = self.colors[change_type]
+            self.material_index[change_type] = len(self.materials)
+            self.materials.append({
+                "name": f"{change_type}Style",
+                "pbrMetallicRoughness": {
+                    "baseColorFactor": [red, green, blue, 1.0],
+                    "metallicFactor": 0.0,
+                    "roughnessFactor": 0.9,
+                },
+                "doubleSided": True,
+            })
+        return self.material_index[change_type]
+
+    def add_buffer_view(self, data, target):
+        # Keep every view 4-byte aligned as the spec requires
+        self.buffer.extend(b"\x00" * (-len(self.buffer) % 4))
+        self.buffer_views.append({
+            "buffer": 0,
+            "byteOffset": len(self.buffer),
+            "byteLength": len(data),
+            "target": target,
+        })
+        self.buffer.extend(data)
+        return len(self.buffer_views) - 1
+
+    def add_mesh(self, key, vertices, faces, change_type):
+        """Adds a mesh once per key; later calls with the same key reuse it."""
+        if key in self.mesh_index:
+            return self.mesh_index[key]
+
+        positions = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        index_type = np.uint16 if len(positions) < 65536 else np.uint32
+        indices = np.asarray(faces, dtype=index_type)
+
+        position_view = self.add_buffer_view(positions.tobytes(), ARRAY_BUFFER)
+        self.accessors.append({
+            "bufferView": position_view,
+            "componentType": FLOAT,
+            "count": len(positions),
+            "type": "VEC3",
+            "min": positions.min(axis=0).tolist(),
+            "max": positions.max(axis=0).tolist(),
+        })
+        index_view = self.add_buffer_view(indices.tobytes(), ELEMENT_ARRAY_BUFFER)
+        self.accessors.append({
+            "bufferView": index_view,
+            "componentType": UNSIGNED_SHORT if index_type is np.uint16 else UNSIGNED_INT,
+            "count": len(indices),
+            "type": "SCALAR",
+        })
+
+        self.meshes.append({
+            "primitives": [{
+                "attributes": {"POSITION": len(self.accessors) - 2},
+                "indices": len(self.accessors) - 1,
+                "material": self.add_material(change_type),
+            }],
+        })
+        self.mesh_index[key] = len(self.meshes) - 1
+        return self.mesh_index[key]
+
+    def add_instance(self, mesh, matrix, name, change_type):
+        self.nodes.append({
+            "name": name,
+            "mesh": mesh,
+            "matrix": matrix,
+            "extras": {"ChangeType": change_type},
+        })
+
+    def write(self, output_path):
+        root = {"name": "ChangeOverlay", "rotation": Z_UP_TO_Y_UP, "children": list(range(len(self.nodes)))}
+        document = {
+            "asset": {"version": "2.0", "generator": "IFC Modification Tracker"},
+            "scene": 0,
+            "scenes": [{"nodes": [len(self.nodes)]}],
+            "nodes": self.nodes + [root],
+            "meshes": self.meshes,
+            "materials": self.materials,
+            "accessors": self.accessors,
+            "bufferViews": self.buffer_views,
+            "buffers": [{"byteLength": len(self.buffer)}],
+        }
+
+        json_chunk = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        json_chunk += b" " * (-len(json_chunk) % 4)
+        bin_chunk = bytes(self.buffer) + b"\x00" * (-len(self.buffer) % 4)
+        total_length = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+
+        with open(output_path, "wb") as file:
+            file.write(struct.pack("<III", GLB_MAGIC, 2, total_length))
+            file.write(struct.pack("<II", len(json_chunk), JSON_CHUNK))
+            file.write(json_chunk)
+            file.write(struct.pack("<II", len(bin_chunk), BIN_CHUNK))
+            file.write(bin_chunk)
+
+
+def iterate_shapes(ifc_file, elements, threads=None):
+    """Tessellates only the given elements with the multi-core geometry iterator."""
+    if not elements:
+        return
+    settings = ifcopenshell.geom.settings()
+    iterator = ifcopenshell.geom.iterator(
+        settings, ifc_file, threads or multiprocessing.cpu_count(), include=elements
+    )
+    if not iterator.initialize():
+        return
+    while True:
+        yield iterator.get()
+        if not iterator.next():
+            break
+
+
+def geometry_digest(vertices, faces):
+    """Hashes the vertex and face buffers, so identical shapes get the same key."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(vertices, dtype=np.float32).tobytes())
+    digest.update(np.asarray(faces, dtype=np.uint32).tobytes())
+    return digest.digest()
+
+
+def add_shapes(builder, model_tag, ifc_file, elements, change_types, threads=None):
+    """Adds one instance per element, sharing meshes between identical shapes.
+
+    Meshes are keyed by a hash of their buffers plus the change type, so
+    repeated walls and doors with separate representations are written once.
+    """
+    digests = {}
+    count = 0
+    for shape in iterate_shapes(ifc_file, elements, threads):
+        geometry = shape.geometry
+        if not geometry.faces:
+            continue
+        change_type = change_types[shape.guid]
+        # Shared representations have the same geometry id, hash those only once
+        geometry_key = (model_tag, geometry.id)
+        if geometry_key not in digests:
+            digests[geometry_key] = geometry_digest(geometry.verts, geometry.faces)
+        mesh = builder.add_mesh((digests[geometry_key], change_type), geometry.verts, geometry.faces, change_type)
+        matrix = ifcopenshell.util.shape.get_shape_matrix(shape)
+        builder.add_instance(mesh, np.asarray(matrix).T.flatten().tolist(), shape.guid, change_type)
+        count += 1
+    return count
+
+
+def export_change_overlay(old_ifc, new_ifc, added_guids, deleted_guids, modified_guids, colors,
+                          output_path="change_overlay.glb", threads=None):
+    """Writes a GLB containing only the changed elements, colored by change type.
+
+    Added and modified elements come from the new model, deleted elements
+    from the old one. colors maps each change type to an (r, g, b) tuple.
+    """
+    builder = GlbBuilder(colors)
+
+    new_change_types = {guid: "Added" for guid in added_guids}
+    new_change_types.update({guid: "Modified" for guid in modified_guids})
+    old_change_types = {guid: "Deleted" for guid in deleted_guids}
+
+    new_elements = [new_ifc.by_guid(guid) for guid in new_change_types]
+    old_elements = [old_ifc.by_guid(guid) for guid in old_change_types]
+
+    count = add_shapes(builder, "new", new_ifc, new_elements, new_change_types, threads)
+    count += add_shapes(builder, "old", old_ifc, old_elements, old_change_types, threads)
+
+    builder.write(output_path)
+    print(f"Change overlay with {count} elements ({len(builder.meshes)} unique meshes) saved as {output_path}")
+    return output_path
@@ -0,0 +1,238 @@
+import numpy as np
+
+# IFC's base64 alphabet for compressed GlobalIds
+GUID_ALPHABET = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$"
+GUID_LENGTH = 22
+
+# A GlobalId as a 128-bit key, split in two 64-bit halves
+KEY_DTYPE = np.dtype([("hi", np.uint64), ("lo", np.uint64)])
+
+DECODE_TABLE = np.full(256, 255, dtype=np.uint8)
+DECODE_TABLE[np.frombuffer(GUID_ALPHABET, dtype=np.uint8)] = np.arange(64, dtype=np.uint8)
+
+# Odd 64-bit constant (2**64 / golden ratio) that spreads hi across all bits of the mix
+MIX_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+def ascii_digits(guids):
+    """Looks up the base64 digits of every 22-character ASCII GlobalId.
+
+    Returns (digits, well_formed): well_formed marks the ids of the right
+    length and encoding, digits holds one row of 22 digits per such id,
+    with 255 for characters outside the alphabet.
+    """
+    try:
+        lengths = np.fromiter(map(len, guids), dtype=np.int64, count=len(guids))
+        well_formed = lengths == GUID_LENGTH
+        candidates = guids if well_formed.all() else [gid for gid, ok in zip(guids, well_formed.tolist()) if ok]
+        raw = "".join(candidates).encode("ascii")
+    except (TypeError, UnicodeEncodeError):
+        # Non-string or non-ASCII ids are rare; only then check each id on its own
+        well_formed = np.fromiter(
+            (isinstance(gid, str) and len(gid) == GUID_LENGTH and gid.isascii() for gid in guids),
+            dtype=bool, count=len(guids),
+        )
+        candidates = [gid for gid, ok in zip(guids, well_formed.tolist()) if ok]
+        raw = "".join(candidates).encode("ascii")
+    return DECODE_TABLE[np.frombuffer(raw, dtype=np.uint8).reshape(-1, GUID_LENGTH)], well_formed
+
+def pack_digits(digits):
+    """Packs columns of base64 digits into one integer per row, first digit highest."""
+    value = np.zeros(len(digits), dtype=np.uint64)
+    for column in range(digits.shape[1]):
+        value = (value << np.uint64(6)) | digits[:, column]
+    return value
+
+def decode_guids(guids):
+    """Decodes a list of GlobalIds to 128-bit keys in one vectorized pass.
+
+    Returns (keys, valid): valid marks the ids that could be decoded and
+    keys holds one key per valid id, in input order. An id is valid when it
+    is 22 characters of the IFC base64 alphabet with a first digit below 4,
+    so that it fits in 128 bits without losing bits.
+    """
+    digits, well_formed = ascii_digits(guids)
+    decodable = ~(digits == 255).any(axis=1) & (digits[:, 0] < 4)
+    if not decodable.all():
+        digits = digits[decodable]
+
+    valid = well_formed.copy()
+    valid[well_formed] = decodable
+
+    # 2 + 6 bits, then two 60-bit runs of ten digits each
+    top = pack_digits(digits[:, :2])
+    middle = pack_digits(digits[:, 2:12])
+    bottom = pack_digits(digits[:, 12:])
+
+    keys = np.empty(len(digits), dtype=KEY_DTYPE)
+    keys["hi"] = (top << np.uint64(56)) | (middle >> np.uint64(4))
+    keys["lo"] = ((middle & np.uint64(0xF)) << np.uint64(60)) | bottom
+    return keys, valid
+
+def mix_keys(keys):
+    """Folds 128-bit keys into 64 bits so they sort with NumPy's native sort.
+
+    Equal keys always mix to the same value. Different keys rarely do, so
+    anything matched on the mix is confirmed on the full key.
+    """
+    with np.errstate(over="ignore"):
+        return keys["lo"] ^ (keys["hi"] * MIX_MULTIPLIER)
+
+def same_keys(keys, left, right):
+    """Elementwise: do the keys at rows left and rows right match?"""
+    return (keys["hi"][left] == keys["hi"][right]) & (keys["lo"][left] == keys["lo"][right])
+
+def first_occurrences(keys):
+    """Rows of keys without repeated GlobalIds, the first of each kept, ordered by mix."""
+    mix = mix_keys(keys)
+    order = np.argsort(mix)
+    repeated = mix[order[1:]] == mix[order[:-1]]
+    if not repeated.any():
+        return order
+
+    # A GlobalId used twice, or a mix collision: dedupe on the exact key
+    order = np.lexsort((keys["lo"], keys["hi"]))
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = ~same_keys(keys, order[1:], order[:-1])
+    order = order[keep]
+    return order[np.argsort(mix[order], kind="stable")]
+
+def match_keys(a, b):
+    """Aligned rows of a and b that hold the same key; neither may repeat a key.
+
+    Like intersect1d: both sides are concatenated, sorted once and every
+    key that appears twice is a match between its two neighbours.
+    """
+    keys = np.concatenate([a, b])
+    mix = mix_keys(keys)
+    order = np.argsort(mix)
+    equal = mix[order[1:]] == mix[order[:-1]]
+    first = np.flatnonzero(equal)
+    left = np.minimum(order[first], order[first + 1])
+    right = np.maximum(order[first], order[first + 1])
+
+    exact = same_keys(keys, left, right).all()
+    one_each = ((left < len(a)) & (right >= len(a))).all()
+    if exact and one_each and not (equal[1:] & equal[:-1]).any():
+        return left, right - len(a)
+
+    # Mix collision: sort on the exact key, a before b among equal keys
+    side = np.repeat(np.array([0, 1], dtype=np.int8), [len(a), len(b)])
+    order = np.lexsort((side, keys["lo"], keys["hi"]))
+    pairs = np.flatnonzero(same_keys(keys, order[1:], order[:-1]) & (side[order[1:]] > side[order[:-1]]))
+    return order[pairs], order[pairs + 1] - len(a)
+
+class GuidIndex:
+    """GlobalIds of one model held as 128-bit keys plus entity ids.
+
+    No per-element Python objects are kept; entities are fetched by id only
+    for the rows a caller actually asks for. GlobalIds that cannot be
+    decoded to a key are kept in a small {GlobalId: entity id} fallback.
+    A GlobalId that occurs twice keeps its first entity.
+    """
+
+    def __init__(self, ifc_file, keys, ids, fallback=None):
+        order = first_occurrences(keys)
+        self.ifc_file = ifc_file
+        self.keys = keys[order]
+        self.ids = ids[order]
+        self.mix = mix_keys(self.keys)   # sorted
+        self.fallback = fallback or {}
+        self.last_match = None           # (other index, rows here, rows in other)
+
+    @classmethod
+    def from_model(cls, ifc_file, ifc_class="IfcElement"):
+        guids = []
+        ids = []
+        for el in ifc_file.by_type(ifc_class):
+            guids.append(el.GlobalId)
+            ids.append(el.id())
+        keys, valid = decode_guids(guids)
+        fallback = {}
+        for row in np.flatnonzero(~valid).tolist():
+            fallback.setdefault(guids[row], ids[row])
+        return cls(ifc_file, keys, np.array(ids, dtype=np.int64)[valid], fallback)
+
+    def __len__(self):
+        return len(self.keys) + len(self.fallback)
+
+    def contains(self, keys):
+        """Returns a boolean mask of which keys are present in this index.
+
+        Meant for a modest number of lookups; whole models are compared
+        with match_keys instead.
+        """
+        mix = mix_keys(keys)
+        start = np.searchsorted(self.mix, mix, side="left")
+        stop = np.searchsorted(self.mix, mix, side="right")
+        found = np.zeros(len(keys), dtype=bool)
+
+        single = np.flatnonzero(stop - start == 1)
+        rows = start[single]
+        found[single] = (self.keys["hi"][rows] == keys["hi"][single]) & (self.keys["lo"][rows] == keys["lo"][single])
+        for row in np.flatnonzero(stop - start > 1).tolist():
+            found[row] = (self.keys[start[row]:stop[row]] == keys[row]).any()
+        return found
+
+    def common_rows(self, other):
+        """Aligned rows of this index and other that share a GlobalId key.
+
+        The last result is kept on both indices, so asking for the added,
+        deleted and common elements of one pair of models sorts only once.
+        """
+        if self.last_match is not None and self.last_match[0] is other:
+            return self.last_match[1], self.last_match[2]
+        rows, other_rows = match_keys(self.keys, other.keys)
+        self.last_match = (other, rows, other_rows)
+        other.last_match = (self, other_rows, rows)
+        return rows, other_rows
+
+    def contains_guids(self, guids):
+        """Returns a boolean mask of which GlobalId strings are present in this index."""
+        keys, valid = decode_guids(guids)
+        mask = np.zeros(len(guids), dtype=bool)
+        mask[valid] = self.contains(keys)
+        for row in np.flatnonzero(~valid).tolist():
+            mask[row] = guids[row] in self.fallback
+        return mask
+
+    def entities(self, ids):
+        """Creates entity instances only for the given entity ids."""
+        return list(self.iter_entities(ids))
+
+    def iter_entities(self, ids):
+        """Like entities, but creates each instance only when it is consumed."""
+        for entity_id in ids.tolist():
+            yield self.ifc_file.by_id(entity_id)
+
+def missing_ids(index, other):
+    """Entity ids of index whose GlobalId is not in other, in file order."""
+    missing = np.ones(len(index.keys), dtype=bool)
+    missing[index.common_rows(other)[0]] = False
+    # An id is either decodable or not, so keys and fallback never overlap
+    fallback_ids = [index.fallback[gid] for gid in index.fallback.keys() - other.fallback.keys()]
+    return np.sort(np.concatenate([index.ids[missing], np.array(fallback_ids, dtype=np.int64)]))
+
+def added_ids(old_index, new_index):
+    """Entity ids in new_index whose GlobalId is not in old_index."""
+    return missing_ids(new_index, old_index)
+
+def deleted_ids(old_index, new_index):
+    """Entity ids in old_index whose GlobalId is not in new_index."""
+    return missing_ids(old_index, new_index)
+
+def get_common_pairs(old_index, new_index):
+    """Aligned (old entity id, new entity id) arrays for GlobalIds in both models.
+
+    Pairs are in the new model's file order.
+    """
+    old_rows, new_rows = old_index.common_rows(new_index)
+    old_ids = old_index.ids[old_rows]
+    new_ids = new_index.ids[new_rows]
+
+    common_fallback = old_index.fallback.keys() & new_index.fallback.keys()
+    if common_fallback:
+        old_ids = np.concatenate([old_ids, [old_index.fallback[gid] for gid in common_fallback]])
+        new_ids = np.concatenate([new_ids, [new_index.fallback[gid] for gid in common_fallback]])
+
+    order = np.argsort(new_ids)
+    return old_ids[order], new_ids[order]
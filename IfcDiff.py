@@ -0,0 +1,313 @@
+import ifcopenshell
+import ifcopenshell.util.element
+import csv
+import os
+import heapq
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import chain, groupby
+import addUser
+from CompressedIO import open_ifc_model, open_report, report_filename
+from RelationshipDiff import describe_parent
+from GuidIndex import GuidIndex, added_ids, deleted_ids, get_common_pairs
+from PropertyChangeLog import flatten_psets, log_property_changes
+from SortedRuns import SortedSpool
+
+# Changes are handed from the diff to the reports and the GUI in chunks of
+# at most this many, or sooner once a chunk has waited this many seconds
+CHUNK_SIZE = 2000
+CHUNK_DELAY_S = 0.25
+
+# Memory ceiling shared by the report writer's two on-disk spools
+REPORT_MEMORY_LIMIT_MB = 128
+
+# The (pset, property) whose value decides whether an element is modified
+REFERENCE_KEY = ("Pset_BuildingElementProxyCommon", "Reference")
+
+def open_ifc_file(file_path):
+    """Opens an IFC file and returns the model instance."""
+    if not os.path.exists(file_path):
+        print(f"Error: File '{file_path}' not found.")
+        return None
+    return open_ifc_model(file_path)
+
+def get_elements_by_globalid(ifc_file):
+    """Returns a dictionary of IFC elements indexed by their GlobalId."""
+    return {el.GlobalId: el for el in ifc_file.by_type("IfcElement")}
+
+def get_user_who_modified(element):
+    """Retrieve the user who last modified the element."""
+    if element.OwnerHistory and element.OwnerHistory.LastModifiedBy:
+        return element.OwnerHistory.LastModifiedBy.Name
+    return "Unknown"
+
+def get_timestamp_of_change(element):
+    """Retrieve the timestamp of when the element was modified."""
+    if element.OwnerHistory and element.OwnerHistory.LastModifiedDate:
+        return datetime.utcfromtimestamp(element.OwnerHistory.LastModifiedDate).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+    return "Unknown"
+
+def get_added_elements(old_ifc, new_ifc, old_index=None, new_index=None):
+    """Finds elements present in the new IFC file but not in the old one."""
+    if old_index is None:
+        old_index = GuidIndex.from_model(old_ifc)
+    if new_index is None:
+        new_index = GuidIndex.from_model(new_ifc)
+
+    return new_index.entities(added_ids(old_index, new_index))
+
+def get_deleted_elements(old_ifc, new_ifc, old_index=None, new_index=None):
+    """Finds elements present in the old IFC file but not in the new one."""
+    if old_index is None:
+        old_index = GuidIndex.from_model(old_ifc)
+    if new_index is None:
+        new_index = GuidIndex.from_model(new_ifc)
+
+    return old_index.entities(deleted_ids(old_index, new_index))
+
+def get_reference_value(element):
+    """Gets the 'Reference' property value from an element's property sets."""
+    property_sets = ifcopenshell.util.element.get_psets(element)
+    return property_sets.get("Pset_BuildingElementProxyCommon", {}).get("Reference", None)
+
+def get_modified_elements(old_ifc, new_ifc, old_index=None, new_index=None):
+    """Finds elements that exist in both files but have modified properties."""
+    return list(iter_modified_elements(old_ifc, new_ifc, old_index, new_index))
+
+def iter_modified_elements(old_ifc, new_ifc, old_index=None, new_index=None, property_log=None):
+    """Yields (new_el, old_reference, new_reference) for each modified element as it is found.
+
+    Each element's property sets are read once. If a PropertyChangeLog is
+    given, every changed property of the common elements is recorded in it
+    during the same pass.
+    """
+    if old_index is None:
+        old_index = GuidIndex.from_model(old_ifc)
+    if new_index is None:
+        new_index = GuidIndex.from_model(new_ifc)
+    old_ids, new_ids = get_common_pairs(old_index, new_index)
+
+    for old_id, new_id in zip(old_ids.tolist(), new_ids.tolist()):
+        new_el = new_ifc.by_id(new_id)
+        old_props = flatten_psets(old_ifc.by_id(old_id))
+        new_props = flatten_psets(new_el)
+
+        if property_log is not None:
+            log_property_changes(property_log, new_el.GlobalId, old_props, new_props)
+
+        old_reference = old_props.get(REFERENCE_KEY)
+        new_reference = new_props.get(REFERENCE_KEY)
+
+        if old_reference != new_reference:
+            yield new_el, old_reference, new_reference
+
+def iter_added_and_deleted(old_index, new_index):
+    """Yields the added, then the deleted changes; only the GUID indices are needed."""
+    for el in new_index.iter_entities(added_ids(old_index, new_index)):
+        yield "Added", el, None, None
+    for el in old_index.iter_entities(deleted_ids(old_index, new_index)):
+        yield "Deleted", el, None, None
+
+def iter_modified_changes(old_ifc, new_ifc, old_index, new_index, property_log=None):
+    """Yields the modified changes as each common pair is compared."""
+    modified = iter_modified_elements(old_ifc, new_ifc, old_index, new_index, property_log)
+    for el, old_ref, new_ref in modified:
+        yield "Modified", el, old_ref, new_ref
+
+def change_phases(old_ifc, new_ifc, old_index=None, new_index=None, property_log=None):
+    """Splits the diff into its fast and its slow part.
+
+    Returns two streams of (change_type, el, old_ref, new_ref): added and
+    deleted elements, then modified elements, filling property_log if one
+    is given. Chunking each phase on its own hands the added and deleted
+    rows on before the slow comparison of the common elements starts.
+    """
+    if old_index is None:
+        old_index = GuidIndex.from_model(old_ifc)
+    if new_index is None:
+        new_index = GuidIndex.from_model(new_ifc)
+    return (
+        iter_added_and_deleted(old_index, new_index),
+        iter_modified_changes(old_ifc, new_ifc, old_index, new_index, property_log),
+    )
+
+def iter_changes(old_ifc, new_ifc, old_index=None, new_index=None, property_log=None):
+    """Yields (change_type, el, old_ref, new_ref) as changes are found.
+
+    Added and deleted elements come first; modified elements follow as
+    each common pair is compared, filling property_log if one is given.
+    """
+    return chain.from_iterable(change_phases(old_ifc, new_ifc, old_index, new_index, property_log))
+
+def iter_chunks(items, chunk_size=CHUNK_SIZE, max_delay=CHUNK_DELAY_S):
+    """Groups a stream into lists of at most chunk_size items.
+
+    A chunk is also handed on once max_delay seconds have passed since its
+    first item, so rows found far apart are not held back until the chunk
+    is full. The delay is checked as items arrive; the last chunk goes out
+    when the stream ends.
+    """
+    chunk = []
+    deadline = None
+    for item in items:
+        if not chunk:
+            deadline = time.monotonic() + max_delay
+        chunk.append(item)
+        if len(chunk) >= chunk_size or time.monotonic() >= deadline:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class ElementRecord:
+    """A stand-in for an IFC entity carrying only what the reports need."""
+
+    __slots__ = ("GlobalId", "ifc_class")
+
+    def __init__(self, global_id, ifc_class):
+        self.GlobalId = global_id
+        self.ifc_class = ifc_class
+
+    def is_a(self):
+        return self.ifc_class
+
+def build_change_record(el, change_type, old_ref, new_ref, user, timestamp):
+    """Builds a flat, all-string change record as shown in the results table."""
+    return (
+        el.GlobalId,
+        change_type,
+        el.is_a(),
+        "" if old_ref is None else str(old_ref),
+        "" if new_ref is None else str(new_ref),
+        user,
+        timestamp,
+    )
+
+class ChangeReportWriter:
+    """Writes the change log row by row while keeping running summaries.
+
+    The user summary is a small counter. Timeline entries and per-element
+    counts are spooled to sorted on-disk runs, so memory stays flat however
+    many changes are written. The summaries are saved on close.
+    extra_columns are written before the standard columns, with the values
+    passed to write as extra.
+    """
+
+    def __init__(self, filename=None, compress=False, memory_limit_mb=REPORT_MEMORY_LIMIT_MB, extra_columns=()):
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"ifc_changes_{timestamp}.csv"
+
+        self.filename = filename
+        self.compress = compress
+        self.counts = Counter()
+        self.user_changes = Counter()
+        self.element_spool = SortedSpool(memory_limit_mb / 2)
+        self.timeline_spool = SortedSpool(memory_limit_mb / 2)
+
+        self.file = open_report(filename, compress)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(
+            list(extra_columns) + ["GlobalId", "ChangeType", "OldReference", "NewReference", "User", "Timestamp"]
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+            self.element_spool.close()
+            self.timeline_spool.close()
+
+    def write(self, change_type, el, old_ref=None, new_ref=None, extra=()):
+        """Writes one change and returns its change record."""
+        user = addUser.assign_random_user()  # Assign random user
+        timestamp = addUser.assign_random_timestamp()  # Assign random timestamp
+        self.writer.writerow(list(extra) + [el.GlobalId, change_type, old_ref, new_ref, user, timestamp])
+
+        self.counts[change_type] += 1
+        self.user_changes[user] += 1
+        self.element_spool.add((el.GlobalId,))
+        self.timeline_spool.add((timestamp, change_type))
+        return build_change_record(el, change_type, old_ref, new_ref, user, timestamp)
+
+    def write_reparented(self, el, kind, old_parent, new_parent):
+        """Writes a re-parenting with the old and new parent in the reference columns."""
+        old_ref = f"{kind}: {describe_parent(old_parent)}"
+        new_ref = f"{kind}: {describe_parent(new_parent)}"
+        return self.write("Reparented", el, old_ref, new_ref)
+
+    def top_elements(self, count=10):
+        """Counts changes per GlobalId from the sorted spool, keeping only the top entries."""
+        totals = ((len(list(group)), gid) for (gid,), group in groupby(self.element_spool))
+        return Counter({gid: total for total, gid in heapq.nlargest(count, totals)})
+
+    def close(self):
+        self.file.close()
+        print(f"Change log saved as {report_filename(self.filename, self.compress)}")
+        save_user_change_summary(self.user_changes, compress=self.compress)
+        save_element_modifications_summary(self.top_elements(), compress=self.compress)
+        save_timeline_data(self.timeline_spool, compress=self.compress, presorted=True)
+        self.element_spool.close()
+        self.timeline_spool.close()
+
+def save_ifc_changes_to_csv(added, deleted, modified, filename=None, compress=False, reparented=()):
+    """Saves IFC changes to a CSV file with random user tracking and timestamps.
+
+    With compress set, every report is written gzip compressed (.csv.gz).
+    Reparented elements are logged as 'Reparented' with the old and new
+    parent in the reference columns.
+    Returns the list of change records that were written.
+    """
+    records = []
+
+    with ChangeReportWriter(filename, compress) as report:
+        for el in added:
+            records.append(report.write("Added", el))
+        for el in deleted:
+            records.append(report.write("Deleted", el))
+        for el, old_ref, new_ref in modified:
+            records.append(report.write("Modified", el, old_ref, new_ref))
+        for el, kind, old_parent, new_parent in reparented:
+            records.append(report.write_reparented(el, kind, old_parent, new_parent))
+
+    return records
+
+def save_user_change_summary(user_changes, filename="user_changes_summary.csv", compress=False):
+    """Saves a summary of changes per user."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(["User", "Number of Changes"])
+        for user, count in user_changes.items():
+            writer.writerow([user, count])
+
+    print(f"User change summary saved as {report_filename(filename, compress)}")
+
+def save_element_modifications_summary(element_modifications, filename="element_modifications_summary.csv", compress=False):
+    """Saves a summary of the most frequently modified elements."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(["GlobalId", "Modification Count"])
+        for gid, count in element_modifications.most_common(10):  # Top 10 modified elements
+            writer.writerow([gid, count])
+
+    print(f"Element modifications summary saved as {report_filename(filename, compress)}")
+
+def save_timeline_data(timeline_data, filename="modification_timeline.csv", compress=False, presorted=False):
+    """Saves a timeline of modifications."""
+    if not presorted:
+        timeline_data = sorted(timeline_data)
+
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(["Timestamp", "Change Type"])
+        for timestamp, change_type in timeline_data:
+            writer.writerow([timestamp, change_type])
+
+    print(f"Timeline data saved as {report_filename(filename, compress)}")
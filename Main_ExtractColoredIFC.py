@@ -1,6 +1,7 @@
 import ifcopenshell
 import ifcopenshell.guid
-import shutil
+from CompressedIO import open_ifc_model, write_ifc_model
+from GltfOverlay import export_change_overlay
 
 
 COLORS = {
@@ -94,12 +95,12 @@ def add_property_to_element(ifc_file, element, property_name, property_value):
         print(f"Error adding property: {e}")
         return False
 
-def process_changes(old_ifc_path, new_ifc_path, output_path):
+def process_changes(old_ifc_path, new_ifc_path, output_path, compress_output=False, overlay_path=None):
     try:
-        shutil.copy(new_ifc_path, output_path)
-        old_ifc = ifcopenshell.open(old_ifc_path)
-        new_ifc = ifcopenshell.open(new_ifc_path)
-        colored_ifc = ifcopenshell.open(output_path)
+        old_ifc = open_ifc_model(old_ifc_path)
+        new_ifc = open_ifc_model(new_ifc_path)
+        # The colored model is a second in-memory copy of the new model; nothing is copied on disk
+        colored_ifc = open_ifc_model(new_ifc_path)
         old_elements = {e.GlobalId: e for e in old_ifc.by_type("IfcProduct") if hasattr(e, "GlobalId")}
         new_elements = {e.GlobalId: e for e in new_ifc.by_type("IfcProduct") if hasattr(e, "GlobalId")}
         added_guids = set(new_elements.keys()) - set(old_elements.keys())
@@ -114,6 +115,8 @@ def process_changes(old_ifc_path, new_ifc_path, output_path):
                 modified_guids.append(guid)
                 
         print(f"Found {len(added_guids)} added, {len(deleted_guids)} deleted, {len(modified_guids)} modified elements")
+        if overlay_path:
+            export_change_overlay(old_ifc, new_ifc, added_guids, deleted_guids, modified_guids, COLORS, overlay_path)
         added_success = modified_success = deleted_success = 0
         added_fail = modified_fail = deleted_fail = 0
         print("\nColoring added elements...")
@@ -151,7 +154,8 @@ def process_changes(old_ifc_path, new_ifc_path, output_path):
                 deleted_fail += 1
                 print(f"⚠️ Failed to copy deleted element: {guid}, Error: {e}")
         
-        colored_ifc.write(output_path)
+        output_path = write_ifc_model(colored_ifc, output_path, compress=compress_output)
+        print(f"Colored model saved as {output_path}")
         
         print("\n----- DETAILED REPORT -----")
         print(f"Added elements: {added_success} successful, {added_fail} failed")
@@ -165,4 +169,4 @@ def process_changes(old_ifc_path, new_ifc_path, output_path):
         return False
     
 if __name__ == "__main__":
-    process_changes("HA_oldVersion.ifc", "HA_newVersion.ifc", "colored_model01.ifc")
+    process_changes("HA_oldVersion.ifc", "HA_newVersion.ifc", "colored_model01.ifc", overlay_path="change_overlay.glb")
@@ -1,163 +1,28 @@
-import ifcopenshell
-import ifcopenshell.util.element
-import csv
 import os
-from collections import Counter
 from datetime import datetime
-import addUser
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import threading
-
-def open_ifc_file(file_path):
-    """Opens an IFC file and returns the model instance."""
-    if not os.path.exists(file_path):
-        print(f"Error: File '{file_path}' not found.")
-        return None
-    return ifcopenshell.open(file_path)
-
-def get_elements_by_globalid(ifc_file):
-    """Returns a dictionary of IFC elements indexed by their GlobalId."""
-    return {el.GlobalId: el for el in ifc_file.by_type("IfcElement")}
-
-def get_user_who_modified(element):
-    """Retrieve the user who last modified the element."""
-    if element.OwnerHistory and element.OwnerHistory.LastModifiedBy:
-        return element.OwnerHistory.LastModifiedBy.Name
-    return "Unknown"
-
-def get_timestamp_of_change(element):
-    """Retrieve the timestamp of when the element was modified."""
-    if element.OwnerHistory and element.OwnerHistory.LastModifiedDate:
-        return datetime.utcfromtimestamp(element.OwnerHistory.LastModifiedDate).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-    return "Unknown"
-
-def get_added_elements(old_ifc, new_ifc):
-    """Finds elements present in the new IFC file but not in the old one."""
-    old_elements = set(get_elements_by_globalid(old_ifc).keys())
-    new_elements = set(get_elements_by_globalid(new_ifc).keys())
-
-    added_elements = new_elements - old_elements
-    return [new_ifc.by_guid(gid) for gid in added_elements]
-
-def get_deleted_elements(old_ifc, new_ifc):
-    """Finds elements present in the old IFC file but not in the new one."""
-    old_elements = set(get_elements_by_globalid(old_ifc).keys())
-    new_elements = set(get_elements_by_globalid(new_ifc).keys())
-
-    deleted_elements = old_elements - new_elements
-    return [old_ifc.by_guid(gid) for gid in deleted_elements]
-
-def get_reference_value(element):
-    """Gets the 'Reference' property value from an element's property sets."""
-    property_sets = ifcopenshell.util.element.get_psets(element)
-    return property_sets.get("Pset_BuildingElementProxyCommon", {}).get("Reference", None)
-
-def get_modified_elements(old_ifc, new_ifc):
-    """Finds elements that exist in both files but have modified properties."""
-    modified_elements = []
-    old_elements = get_elements_by_globalid(old_ifc)
-    new_elements = get_elements_by_globalid(new_ifc)
-
-    common_elements = old_elements.keys() & new_elements.keys()
-
-    for gid in common_elements:
-        old_el = old_elements[gid]
-        new_el = new_elements[gid]
-
-        old_reference = get_reference_value(old_el)
-        new_reference = get_reference_value(new_el)
-
-        if old_reference != new_reference:
-            modified_elements.append((new_el, old_reference, new_reference))
-
-    return modified_elements
-
-def save_ifc_changes_to_csv(added, deleted, modified, filename=None):
-    """Saves IFC changes to a CSV file with random user tracking and timestamps."""
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"ifc_changes_{timestamp}.csv"
-
-    user_changes = Counter()
-    element_modifications = Counter()
-    timeline_data = []
-
-    with open(filename, "w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(
-            ["GlobalId", "ChangeType", "OldReference", "NewReference", "User", "Timestamp"]
-        )
-
-        for el in added:
-            user = addUser.assign_random_user()  # Assign random user
-            timestamp = addUser.assign_random_timestamp()  # Assign random timestamp
-            writer.writerow([el.GlobalId, "Added", "", "", user, timestamp])
-
-            user_changes[user] += 1
-            element_modifications[el.GlobalId] += 1
-            timeline_data.append((timestamp, "Added"))
-
-        for el in deleted:
-            user = addUser.assign_random_user()  # Assign random user
-            timestamp = addUser.assign_random_timestamp()  # Assign random timestamp
-            writer.writerow([el.GlobalId, "Deleted", "", "", user, timestamp])
-
-            user_changes[user] += 1
-            element_modifications[el.GlobalId] += 1
-            timeline_data.append((timestamp, "Deleted"))
-
-        for el, old_ref, new_ref in modified:
-            user = addUser.assign_random_user()  # Assign random user
-            timestamp = addUser.assign_random_timestamp()  # Assign random timestamp
-            writer.writerow([el.GlobalId, "Modified", old_ref, new_ref, user, timestamp])
-
-            user_changes[user] += 1
-            element_modifications[el.GlobalId] += 1
-            timeline_data.append((timestamp, "Modified"))
-
-    print(f"Change log saved as {filename}")
-    save_user_change_summary(user_changes)
-    save_element_modifications_summary(element_modifications)
-    save_timeline_data(timeline_data)
-
-def save_user_change_summary(user_changes, filename="user_changes_summary.csv"):
-    """Saves a summary of changes per user."""
-    with open(filename, "w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["User", "Number of Changes"])
-        for user, count in user_changes.items():
-            writer.writerow([user, count])
-
-    print(f"User change summary saved as {filename}")
-
-def save_element_modifications_summary(element_modifications, filename="element_modifications_summary.csv"):
-    """Saves a summary of the most frequently modified elements."""
-    with open(filename, "w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["GlobalId", "Modification Count"])
-        for gid, count in element_modifications.most_common(10):  # Top 10 modified elements
-            writer.writerow([gid, count])
-
-    print(f"Element modifications summary saved as {filename}")
-
-def save_timeline_data(timeline_data, filename="modification_timeline.csv"):
-    """Saves a timeline of modifications."""
-    with open(filename, "w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "Change Type"])
-        for timestamp, change_type in sorted(timeline_data):
-            writer.writerow([timestamp, change_type])
-
-    print(f"Timeline data saved as {filename}")
+import queue
+from ChangeTableView import ChangeTableView
+from IfcDiff import change_phases
+# Defined here before they moved to IfcDiff; still importable from this module
+from IfcDiff import (
+    ChangeReportWriter, get_added_elements, get_deleted_elements, get_elements_by_globalid,
+    get_modified_elements, get_reference_value, get_timestamp_of_change, get_user_who_modified,
+    iter_changes, iter_chunks, open_ifc_file, save_element_modifications_summary,
+    save_ifc_changes_to_csv, save_timeline_data, save_user_change_summary,
+)
+from RelationshipDiff import build_parent_maps, get_reparented_elements
+from GuidIndex import GuidIndex
+from QuantityDiff import get_quantity_changes, save_quantity_changes_to_csv, save_quantity_rollup
+from PropertyChangeLog import PropertyChangeLog, save_property_changes, save_property_change_summary
 
 class ModificationTrackerApp:
     def __init__(self, root):
         self.root = root
         self.root.title("IFC Modification Tracker")
-        self.root.geometry("700x450")
+        self.root.geometry("1000x700")
         self.root.configure(padx=20, pady=20)
         
         # File path variables
@@ -165,9 +30,14 @@ class ModificationTrackerApp:
         self.new_ifc_path = tk.StringVar()
         self.output_folder = tk.StringVar()
         self.output_folder.set(os.getcwd())  # Default to current directory
+        self.compress_reports = tk.BooleanVar(value=False)
+        
+        # Messages from the analysis thread, drained on the Tk thread
+        self.ui_queue = queue.Queue()
         
         # Create UI elements
         self.create_widgets()
+        self.poll_ui_queue()
         
     def create_widgets(self):
         # Create frame for file selection
@@ -189,19 +59,26 @@ class ModificationTrackerApp:
         ttk.Entry(file_frame, textvariable=self.output_folder, width=50).grid(row=2, column=1, padx=5, pady=5)
         ttk.Button(file_frame, text="Browse...", command=self.browse_output_folder).grid(row=2, column=2, padx=5, pady=5)
         
+        # Compressed output
+        ttk.Checkbutton(file_frame, text="Compress reports (.csv.gz)", variable=self.compress_reports).grid(row=3, column=1, sticky="w", padx=5, pady=5)
+        
         # Results frame
         results_frame = ttk.LabelFrame(self.root, text="Results")
         results_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
         # Results text
-        self.results_text = tk.Text(results_frame, height=10, state="disabled")
-        self.results_text.pack(fill="both", expand=True, padx=5, pady=5)
+        self.results_text = tk.Text(results_frame, height=5, state="disabled")
+        self.results_text.pack(fill="x", padx=5, pady=5)
         
         # Scrollbar for results
         scrollbar = ttk.Scrollbar(self.results_text, command=self.results_text.yview)
         scrollbar.pack(side="right", fill="y")
         self.results_text.config(yscrollcommand=scrollbar.set)
         
+        # Change table
+        self.change_table = ChangeTableView(results_frame)
+        self.change_table.pack(fill="both", expand=True, padx=5, pady=5)
+        
         # Progress bar
         self.progress = ttk.Progressbar(self.root, orient="horizontal", length=200, mode="indeterminate")
         self.progress.pack(fill="x", padx=5, pady=5)
@@ -217,7 +94,7 @@ class ModificationTrackerApp:
     def browse_old_ifc(self):
         filename = filedialog.askopenfilename(
             title="Select Old Version IFC File",
-            filetypes=[("IFC Files", "*.ifc"), ("All Files", "*.*")]
+            filetypes=[("IFC Files", "*.ifc *.ifczip *.gz"), ("All Files", "*.*")]
         )
         if filename:
             self.old_ifc_path.set(filename)
@@ -225,7 +102,7 @@ class ModificationTrackerApp:
     def browse_new_ifc(self):
         filename = filedialog.askopenfilename(
             title="Select New Version IFC File",
-            filetypes=[("IFC Files", "*.ifc"), ("All Files", "*.*")]
+            filetypes=[("IFC Files", "*.ifc *.ifczip *.gz"), ("All Files", "*.*")]
         )
         if filename:
             self.new_ifc_path.set(filename)
@@ -235,12 +112,27 @@ class ModificationTrackerApp:
         if folder:
             self.output_folder.set(folder)
     
+    def run_on_ui_thread(self, callback, *args):
+        """Queues a callback to run on the Tk thread; safe to call from any thread."""
+        self.ui_queue.put((callback, args))
+    
+    def poll_ui_queue(self):
+        try:
+            while True:
+                callback, args = self.ui_queue.get_nowait()
+                callback(*args)
+        except queue.Empty:
+            pass
+        self.root.after(100, self.poll_ui_queue)
+    
     def log_message(self, message):
+        self.run_on_ui_thread(self.append_log, message)
+    
+    def append_log(self, message):
         self.results_text.config(state="normal")
         self.results_text.insert(tk.END, message + "\n")
         self.results_text.see(tk.END)
         self.results_text.config(state="disabled")
-        self.root.update_idletasks()
     
     def run_analysis(self):
         # Validate inputs
@@ -264,6 +156,7 @@ class ModificationTrackerApp:
         self.results_text.config(state="normal")
         self.results_text.delete(1.0, tk.END)
         self.results_text.config(state="disabled")
+        self.change_table.set_records([])
         
         # Start progress bar
         self.progress.start()
@@ -284,28 +177,52 @@ class ModificationTrackerApp:
             
             if not old_ifc or not new_ifc:
                 self.log_message("Failed to load IFC files. Check if they are valid IFC files.")
-                self.progress.stop()
                 return
             
-            # Get elements
-            self.log_message("Analyzing changes...")
-            added_elements = get_added_elements(old_ifc, new_ifc)
-            deleted_elements = get_deleted_elements(old_ifc, new_ifc)
-            modified_elements = get_modified_elements(old_ifc, new_ifc)
-            
-            # Log results
-            self.log_message(f"Found {len(added_elements)} added elements")
-            self.log_message(f"Found {len(deleted_elements)} deleted elements")
-            self.log_message(f"Found {len(modified_elements)} modified elements")
-            
             # Generate timestamp for filenames
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"ifc_changes_{timestamp}.csv"
+            compress = self.compress_reports.get()
+            
+            # Stream changes into the reports and the table as they are found
+            self.log_message("Analyzing changes...")
+            old_index = GuidIndex.from_model(old_ifc)
+            new_index = GuidIndex.from_model(new_ifc)
+            property_changes = PropertyChangeLog()
+            
+            with ChangeReportWriter(os.path.join(self.output_folder.get(), filename), compress) as report:
+                # Added and deleted rows reach the table before the slow modified phase starts
+                for phase in change_phases(old_ifc, new_ifc, old_index, new_index, property_changes):
+                    for chunk in iter_chunks(phase):
+                        records = [report.write(*change) for change in chunk]
+                        self.run_on_ui_thread(self.change_table.append_records, records)
+                
+                # One pass over each model's relationships, shared with the quantity rollup
+                old_parent_maps = build_parent_maps(old_ifc)
+                new_parent_maps = build_parent_maps(new_ifc)
+                reparented_elements = get_reparented_elements(old_ifc, new_ifc, old_index, new_index,
+                                                              old_parent_maps, new_parent_maps)
+                records = [report.write_reparented(*item) for item in reparented_elements]
+                self.run_on_ui_thread(self.change_table.append_records, records)
+                
+                # Log results
+                self.log_message(f"Found {report.counts['Added']} added elements")
+                self.log_message(f"Found {report.counts['Deleted']} deleted elements")
+                self.log_message(f"Found {report.counts['Modified']} modified elements")
+                self.log_message(f"Found {report.counts['Reparented']} reparented elements")
+                self.log_message("Saving reports...")
+            
+            self.log_message(f"Found {len(property_changes)} changed property values")
+            save_property_changes(property_changes, compress=compress)
+            save_property_change_summary(property_changes, compress=compress)
+            save_element_modifications_summary(property_changes.element_change_counts(),
+                                               filename="element_property_changes_summary.csv",
+                                               compress=compress)
             
-            # Save to CSV
-            self.log_message("Saving reports...")
-            save_ifc_changes_to_csv(added_elements, deleted_elements, modified_elements, 
-                                   filename=os.path.join(self.output_folder.get(), filename))
+            quantity_changes = get_quantity_changes(old_ifc, new_ifc, parent_maps=new_parent_maps)
+            self.log_message(f"Found {len(quantity_changes['rows'])} changed quantities")
+            save_quantity_changes_to_csv(quantity_changes, compress=compress)
+            save_quantity_rollup(quantity_changes, compress=compress)
             
             self.log_message("Analysis completed successfully!")
             self.log_message(f"Reports saved to {self.output_folder.get()}")
@@ -315,7 +232,7 @@ class ModificationTrackerApp:
         except Exception as e:
             self.log_message(f"An error occurred: {e}")
         finally:
-            self.progress.stop()
+            self.run_on_ui_thread(self.progress.stop)
 
 def main():
     root = tk.Tk()
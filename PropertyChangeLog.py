@@ -0,0 +1,167 @@
+import csv
+from array import array
+from collections import Counter
+import numpy as np
+import ifcopenshell.util.element
+from CompressedIO import open_report, report_filename
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional, CSV is always available
+    pa = None
+    pq = None
+
+# Code used for a property that is missing on one side
+MISSING = -1
+
+COLUMNS = ("GlobalId", "PropertySet", "Property", "OldValue", "NewValue")
+
+
+class StringPool:
+    """Interns strings to small integer codes, keeping each distinct value once."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class PropertyChangeLog:
+    """Long-format property changes stored as dictionary-encoded int32 columns.
+
+    Pset and property names share one pool and values another, so a
+    diff touching millions of values keeps only one copy of each distinct
+    string plus four bytes per cell.
+    """
+
+    def __init__(self):
+        self.guids = StringPool()
+        self.names = StringPool()   # pset and property names
+        self.values = StringPool()
+        self.columns = {name: array("i") for name in COLUMNS}
+
+    def __len__(self):
+        return len(self.columns["GlobalId"])
+
+    def add(self, gid, pset, prop, old_value, new_value):
+        self.columns["GlobalId"].append(self.guids.code(gid))
+        self.columns["PropertySet"].append(self.names.code(pset))
+        self.columns["Property"].append(self.names.code(prop))
+        self.columns["OldValue"].append(self.encode_value(old_value))
+        self.columns["NewValue"].append(self.encode_value(new_value))
+
+    def encode_value(self, value):
+        return MISSING if value is None else self.values.code(str(value))
+
+    def pool_for(self, column):
+        if column == "GlobalId":
+            return self.guids
+        if column in ("PropertySet", "Property"):
+            return self.names
+        return self.values
+
+    def decode(self, column):
+        """Yields the string values of one column, with '' for missing values."""
+        values = self.pool_for(column).values
+        for code in self.columns[column]:
+            yield values[code] if code != MISSING else ""
+
+    def rows(self):
+        """Yields decoded (GlobalId, pset, property, old, new) rows."""
+        return zip(*(self.decode(column) for column in COLUMNS))
+
+    def element_change_counts(self):
+        """Number of changed properties per GlobalId, for the element summary."""
+        guids = self.guids.values
+        return Counter({guids[code]: count for code, count in Counter(self.columns["GlobalId"]).items()})
+
+    def property_change_counts(self):
+        """Number of changes per (pset, property)."""
+        names = self.names.values
+        pairs = Counter(zip(self.columns["PropertySet"], self.columns["Property"]))
+        return Counter({(names[pset], names[prop]): count for (pset, prop), count in pairs.items()})
+
+
+def strip_ids(value):
+    """Removes the entity 'id' keys, which are renumbered between exports, at every level."""
+    if isinstance(value, dict):
+        return {key: strip_ids(item) for key, item in value.items() if key != "id"}
+    if isinstance(value, (list, tuple)):
+        return type(value)(strip_ids(item) for item in value)
+    return value
+
+def flatten_psets(element):
+    """Returns {(pset, property): value} for an element, without the internal 'id' keys."""
+    flat = {}
+    for pset, properties in ifcopenshell.util.element.get_psets(element).items():
+        for prop, value in properties.items():
+            if prop != "id":
+                flat[(pset, prop)] = strip_ids(value)
+    return flat
+
+def log_property_changes(log, gid, old_props, new_props):
+    """Adds every changed, added or removed property of one element to the log.
+
+    old_props and new_props are flatten_psets results, so the property sets
+    read for the Reference comparison are reused here.
+    """
+    for key in old_props.keys() | new_props.keys():
+        old_value = old_props.get(key)
+        new_value = new_props.get(key)
+        if old_value != new_value:
+            log.add(gid, key[0], key[1], old_value, new_value)
+
+def save_property_changes(log, filename="property_changes.parquet", compress=False):
+    """Saves the property change log as dictionary-encoded Parquet.
+
+    Falls back to CSV (gzip compressed when asked) if pyarrow is not installed.
+    Returns the path that was written.
+    """
+    if pa is None or not filename.endswith(".parquet"):
+        if filename.endswith(".parquet"):
+            filename = filename[:-len(".parquet")] + ".csv"
+        return save_property_changes_to_csv(log, filename, compress)
+
+    arrays = []
+    for column in COLUMNS:
+        codes = np.frombuffer(log.columns[column], dtype=np.int32)
+        # Missing values become nulls instead of a dictionary entry
+        indices = pa.array(codes, type=pa.int32(), mask=codes == MISSING)
+        dictionary = pa.array(log.pool_for(column).values, type=pa.string())
+        arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+
+    table = pa.Table.from_arrays(arrays, names=list(COLUMNS))
+    pq.write_table(table, filename, use_dictionary=True, compression="zstd" if compress else "snappy")
+    print(f"Property changes saved as {filename}")
+    return filename
+
+def save_property_changes_to_csv(log, filename="property_changes.csv", compress=False):
+    """Saves the property change log as a long-format CSV."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(list(COLUMNS))
+        writer.writerows(log.rows())
+
+    filename = report_filename(filename, compress)
+    print(f"Property changes saved as {filename}")
+    return filename
+
+def save_property_change_summary(log, filename="property_change_summary.csv", compress=False):
+    """Saves the most frequently changed properties."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(["PropertySet", "Property", "Number of Changes"])
+        for (pset, prop), count in log.property_change_counts().most_common():
+            writer.writerow([pset, prop, count])
+
+    print(f"Property change summary saved as {report_filename(filename, compress)}")
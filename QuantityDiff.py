@@ -0,0 +1,216 @@
+import csv
+import numpy as np
+from CompressedIO import open_report, report_filename
+from RelationshipDiff import build_parent_maps
+
+# Kinds of base quantity that are compared
+QUANTITY_KINDS = ("Volume", "Area", "Length")
+
+# Quantity entity -> (kind index, value attribute)
+QUANTITY_TYPES = {
+    "IfcQuantityVolume": (0, "VolumeValue"),
+    "IfcQuantityArea": (1, "AreaValue"),
+    "IfcQuantityLength": (2, "LengthValue"),
+}
+
+# Default tolerances: absolute in model units per kind, relative as a fraction
+DEFAULT_ABS_TOLERANCE = (1e-6, 1e-6, 1e-6)
+DEFAULT_REL_TOLERANCE = 1e-4
+
+UNASSIGNED = "Unassigned"
+
+def extract_base_quantities(ifc_file):
+    """Collects every volume, area and length quantity from the IfcElementQuantity sets.
+
+    Walks IfcRelDefinesByProperties once. Returns {(GlobalId, quantity name):
+    (kind index, value)}. If two sets on one element carry the same quantity
+    name, the set whose name sorts first wins, so the result does not depend
+    on file order.
+    """
+    quantities = {}
+    set_names = {}
+
+    for rel in ifc_file.by_type("IfcRelDefinesByProperties"):
+        definition = rel.RelatingPropertyDefinition
+        if definition is None or not definition.is_a("IfcElementQuantity"):
+            continue
+        set_name = definition.Name or ""
+
+        for quantity in definition.Quantities or ():
+            quantity_type = QUANTITY_TYPES.get(quantity.is_a())
+            if quantity_type is None or not quantity.Name:
+                continue
+            kind, attribute = quantity_type
+            value = getattr(quantity, attribute)
+
+            for obj in rel.RelatedObjects:
+                key = (obj.GlobalId, quantity.Name)
+                if key not in quantities or set_name < set_names[key]:
+                    quantities[key] = (kind, value)
+                    set_names[key] = set_name
+
+    return quantities
+
+def align_quantities(quantities, keys):
+    """Builds a float array of quantity values in the order of keys, NaN where missing."""
+    missing = (0, np.nan)
+    return np.array([quantities.get(key, missing)[1] for key in keys], dtype=np.float64)
+
+def compare_quantities(old_values, new_values, abs_tolerance=DEFAULT_ABS_TOLERANCE[0],
+                       rel_tolerance=DEFAULT_REL_TOLERANCE):
+    """Vectorized delta computation for two aligned quantity arrays.
+
+    abs_tolerance is a scalar or one value per quantity. Returns (delta,
+    relative_delta, changed). A quantity that appears or disappears counts
+    as changed, with the missing side taken as zero.
+    """
+    abs_tolerance = np.asarray(abs_tolerance, dtype=np.float64)
+    both_missing = np.isnan(old_values) & np.isnan(new_values)
+    delta = np.where(both_missing, np.nan, np.nan_to_num(new_values) - np.nan_to_num(old_values))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_delta = np.where(old_values != 0, delta / np.abs(old_values), np.nan)
+
+    within_tolerance = np.isclose(new_values, old_values, rtol=rel_tolerance, atol=abs_tolerance, equal_nan=True)
+    return delta, relative_delta, ~within_tolerance
+
+def rollup(labels, quantity_codes, element_codes, delta, quantity_count):
+    """Sums the deltas of changed quantities per label, one column per quantity name.
+
+    All arrays describe changed quantities only. Returns a list of
+    (label, changed element count, [delta per quantity name]).
+    """
+    unique_labels, inverse = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+
+    totals = np.zeros((len(unique_labels), quantity_count))
+    np.add.at(totals, (inverse, quantity_codes), np.nan_to_num(delta))
+
+    # An element counts once per label however many of its quantities changed
+    stride = int(element_codes.max(initial=0)) + 1
+    pairs = np.unique(inverse.astype(np.int64) * stride + element_codes)
+    counts = np.bincount(pairs // stride, minlength=len(unique_labels))
+
+    return [
+        (label, int(count), row)
+        for label, count, row in zip(unique_labels, counts, totals.tolist())
+    ]
+
+def find_storey(gid, containers, aggregates, cache):
+    """Walks containment and aggregation up to the element's IfcBuildingStorey.
+
+    Spaces, assemblies and other intermediate parents are passed through.
+    Returns None when no storey is found.
+    """
+    visited = []
+    storey = None
+    while gid not in cache and gid not in visited:
+        visited.append(gid)
+        _, parent = containers.get(gid) or aggregates.get(gid) or (None, None)
+        if parent is None:
+            break
+        if parent.is_a("IfcBuildingStorey"):
+            storey = parent
+            break
+        gid = parent.GlobalId
+    else:
+        storey = cache.get(gid)
+
+    for seen in visited:
+        cache[seen] = storey
+    return storey
+
+def get_quantity_changes(old_ifc, new_ifc, abs_tolerance=DEFAULT_ABS_TOLERANCE,
+                         rel_tolerance=DEFAULT_REL_TOLERANCE, parent_maps=None):
+    """Diffs the base quantities of all elements present in both models.
+
+    Quantities are compared by (GlobalId, quantity name), e.g. NetSideArea
+    and GrossSideArea separately. Returns a dict with the changed rows, the
+    names of the changed quantities and per-class and per-storey rollups.
+    parent_maps is the build_parent_maps result for new_ifc, if already built.
+    """
+    old_quantities = extract_base_quantities(old_ifc)
+    new_quantities = extract_base_quantities(new_ifc)
+
+    new_elements = {el.GlobalId: el for el in new_ifc.by_type("IfcElement")}
+    old_guids = {el.GlobalId for el in old_ifc.by_type("IfcElement")}
+    common = old_guids & new_elements.keys()
+    keys = sorted(key for key in old_quantities.keys() | new_quantities.keys() if key[0] in common)
+
+    kinds = np.array(
+        [(new_quantities.get(key) or old_quantities[key])[0] for key in keys], dtype=np.int64
+    )
+    old_values = align_quantities(old_quantities, keys)
+    new_values = align_quantities(new_quantities, keys)
+    delta, relative_delta, changed = compare_quantities(
+        old_values, new_values, np.asarray(abs_tolerance, dtype=np.float64)[kinds], rel_tolerance
+    )
+
+    changed_rows = np.flatnonzero(changed)
+    changed_keys = [keys[i] for i in changed_rows]
+    guids = [gid for gid, _ in changed_keys]
+    classes = [new_elements[gid].is_a() for gid in guids]
+
+    if parent_maps is None:
+        parent_maps = build_parent_maps(new_ifc)
+    cache = {}
+    storeys = []
+    storey_names = {}
+    for gid in guids:
+        storey = find_storey(gid, parent_maps["Container"], parent_maps["Aggregate"], cache)
+        if storey is None:
+            storeys.append(UNASSIGNED)
+        else:
+            storeys.append(storey.GlobalId)
+            storey_names[storey.GlobalId] = storey.Name or ""
+
+    quantity_names, quantity_codes = np.unique(
+        np.array([name for _, name in changed_keys], dtype=object), return_inverse=True
+    )
+    _, element_codes = np.unique(np.array(guids, dtype=object), return_inverse=True)
+    changed_delta = delta[changed_rows]
+
+    rows = [
+        (gid, ifc_class, name, QUANTITY_KINDS[kind], *values)
+        for (gid, name), ifc_class, kind, values in zip(
+            changed_keys, classes, kinds[changed_rows].tolist(),
+            np.column_stack([old_values, new_values, delta, relative_delta])[changed_rows].tolist(),
+        )
+    ]
+    by_class = rollup(classes, quantity_codes, element_codes, changed_delta, len(quantity_names))
+    by_storey = rollup(storeys, quantity_codes, element_codes, changed_delta, len(quantity_names))
+
+    return {
+        "rows": rows,
+        "quantities": quantity_names.tolist(),
+        "by_class": [(ifc_class, "", count, totals) for ifc_class, count, totals in by_class],
+        "by_storey": [
+            (storey_names.get(gid, UNASSIGNED), "" if gid == UNASSIGNED else gid, count, totals)
+            for gid, count, totals in by_storey
+        ],
+    }
+
+def save_quantity_changes_to_csv(quantity_changes, filename="quantity_changes.csv", compress=False):
+    """Saves per-element, per-quantity deltas."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["GlobalId", "IfcClass", "Quantity", "Kind", "OldValue", "NewValue", "Delta", "RelativeDelta"]
+        )
+        for row in quantity_changes["rows"]:
+            writer.writerow(["" if value != value else value for value in row])  # NaN -> empty
+
+    print(f"Quantity changes saved as {report_filename(filename, compress)}")
+
+def save_quantity_rollup(quantity_changes, filename="quantity_rollup.csv", compress=False):
+    """Saves total quantity deltas per IFC class and per storey, one column per quantity."""
+    with open_report(filename, compress) as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["Group", "Name", "GlobalId", "Changed Elements"]
+            + [f"Delta{name}" for name in quantity_changes["quantities"]]
+        )
+        for group, key in (("IfcClass", "by_class"), ("Storey", "by_storey")):
+            for name, gid, count, totals in quantity_changes[key]:
+                writer.writerow([group, name, gid, count] + totals)
+
+    print(f"Quantity rollup saved as {report_filename(filename, compress)}")
@@ -0,0 +1,83 @@
+from GuidIndex import GuidIndex
+
+# Relationship type -> (relating attribute, related attribute, parent kind)
+RELATIONSHIPS = {
+    "IfcRelContainedInSpatialStructure": ("RelatingStructure", "RelatedElements", "Container"),
+    "IfcRelAggregates": ("RelatingObject", "RelatedObjects", "Aggregate"),
+    "IfcRelDefinesByType": ("RelatingType", "RelatedObjects", "Type"),
+    "IfcRelVoidsElement": ("RelatingBuildingElement", "RelatedOpeningElement", "VoidedElement"),
+}
+
+def build_parent_maps(ifc_file):
+    """Indexes every child's parent, per relationship kind, in one pass over the relationships.
+
+    Returns {kind: {child GlobalId: (child, parent)}}.
+    """
+    parent_maps = {kind: {} for _, _, kind in RELATIONSHIPS.values()}
+
+    for rel_type, (relating_attr, related_attr, kind) in RELATIONSHIPS.items():
+        parent_map = parent_maps[kind]
+        for rel in ifc_file.by_type(rel_type):
+            parent = getattr(rel, relating_attr)
+            related = getattr(rel, related_attr)
+            if parent is None or related is None:
+                continue
+            # IfcRelVoidsElement relates a single opening, the others a list
+            if not isinstance(related, (list, tuple)):
+                related = (related,)
+            for child in related:
+                parent_map[child.GlobalId] = (child, parent)
+
+    return parent_maps
+
+def describe_parent(parent):
+    """Returns a readable label for a parent object, e.g. 'IfcBuildingStorey Level 1'."""
+    if parent is None:
+        return ""
+    name = getattr(parent, "Name", None)
+    return f"{parent.is_a()} {name}" if name else f"{parent.is_a()} {parent.GlobalId}"
+
+def get_reparented_elements(old_ifc, new_ifc, old_index=None, new_index=None, old_maps=None, new_maps=None):
+    """Finds elements whose container, aggregate, type or voided element changed.
+
+    Only IfcElements present in both models are reported, checked against
+    the GUID indices; pass the ones already built for the diff to reuse
+    them, and the build_parent_maps results if other reports share them.
+    Returns a list of (new_el, kind, old_parent, new_parent).
+    """
+    if old_index is None:
+        old_index = GuidIndex.from_model(old_ifc)
+    if new_index is None:
+        new_index = GuidIndex.from_model(new_ifc)
+
+    if old_maps is None:
+        old_maps = build_parent_maps(old_ifc)
+    if new_maps is None:
+        new_maps = build_parent_maps(new_ifc)
+
+    candidates = []
+    for kind, old_map in old_maps.items():
+        new_map = new_maps[kind]
+
+        for gid in old_map.keys() | new_map.keys():
+            _, old_parent = old_map.get(gid, (None, None))
+            new_child, new_parent = new_map.get(gid, (None, None))
+
+            old_parent_id = old_parent.GlobalId if old_parent else None
+            new_parent_id = new_parent.GlobalId if new_parent else None
+            if old_parent_id != new_parent_id:
+                candidates.append((gid, new_child, kind, old_parent, new_parent))
+
+    # Added and deleted elements are reported elsewhere, spatial structure is out of scope
+    guids = [gid for gid, _, _, _, _ in candidates]
+    in_both = old_index.contains_guids(guids) & new_index.contains_guids(guids)
+
+    reparented_elements = []
+    for (gid, new_child, kind, old_parent, new_parent), common in zip(candidates, in_both.tolist()):
+        if not common:
+            continue
+        if new_child is None:
+            new_child = new_ifc.by_guid(gid)
+        reparented_elements.append((new_child, kind, old_parent, new_parent))
+
+    return reparented_elements
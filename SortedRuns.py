@@ -0,0 +1,114 @@
+import heapq
+import os
+import shutil
+import tempfile
+
+# Default memory ceiling for the in-memory part of each sorted run
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+# Rough size of one small tuple-of-strings record held in a Python list
+RECORD_SIZE_BYTES = 300
+
+# Most run files merged at once, well below the usual open-file limits
+MAX_MERGE_RUNS = 64
+
+def run_size_for(memory_limit_mb):
+    """Number of records that fit in one in-memory run."""
+    return max(1000, int(memory_limit_mb * 1024 * 1024) // RECORD_SIZE_BYTES)
+
+def write_run(records, run_path):
+    """Writes already sorted records as tab separated lines."""
+    with open(run_path, "w", encoding="utf-8", newline="\n") as file:
+        file.writelines("\t".join(record) + "\n" for record in records)
+
+def write_sorted_runs(records, temp_dir, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+    """Sorts records in memory-sized batches and spills each batch to disk."""
+    run_size = run_size_for(memory_limit_mb)
+    run_paths = []
+    batch = []
+
+    def spill():
+        batch.sort()
+        run_path = os.path.join(temp_dir, f"run_{len(run_paths):05d}.tsv")
+        write_run(batch, run_path)
+        run_paths.append(run_path)
+        batch.clear()
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= run_size:
+            spill()
+    if batch or not run_paths:
+        spill()
+    return run_paths
+
+def read_run(run_path):
+    with open(run_path, "r", encoding="utf-8") as file:
+        for line in file:
+            yield tuple(line.rstrip("\n").split("\t"))
+
+def merge_run_files(run_paths, output_path):
+    """Merges sorted runs into one new run and deletes the inputs."""
+    write_run(heapq.merge(*(read_run(path) for path in run_paths)), output_path)
+    for path in run_paths:
+        os.remove(path)
+
+class SortedSpool:
+    """Collects records and hands them back sorted, spilling to disk past a memory ceiling.
+
+    Records are tuples of strings without tabs or newlines.
+    """
+
+    def __init__(self, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, temp_dir=None):
+        self.run_size = run_size_for(memory_limit_mb)
+        self.temp_dir = temp_dir
+        self.work_dir = None
+        self.run_paths = []
+        self.batch = []
+        self.merge_count = 0
+
+    def add(self, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.run_size:
+            self.spill()
+
+    def spill(self):
+        if self.work_dir is None:
+            self.work_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        self.batch.sort()
+        run_path = os.path.join(self.work_dir, f"run_{len(self.run_paths):05d}.tsv")
+        write_run(self.batch, run_path)
+        self.run_paths.append(run_path)
+        self.batch = []
+
+    def __iter__(self):
+        if not self.run_paths:
+            # Sort in place so an unspilled spool never holds two copies
+            self.batch.sort()
+            return iter(self.batch)
+        if self.batch:
+            self.spill()
+        self.reduce_runs()
+        return heapq.merge(*(read_run(path) for path in self.run_paths))
+
+    def reduce_runs(self):
+        """Merges runs in groups of MAX_MERGE_RUNS until one final merge can open them all."""
+        while len(self.run_paths) > MAX_MERGE_RUNS:
+            merged = []
+            for start in range(0, len(self.run_paths), MAX_MERGE_RUNS):
+                group = self.run_paths[start:start + MAX_MERGE_RUNS]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                merge_path = os.path.join(self.work_dir, f"merge_{self.merge_count:05d}.tsv")
+                self.merge_count += 1
+                merge_run_files(group, merge_path)
+                merged.append(merge_path)
+            self.run_paths = merged
+
+    def close(self):
+        if self.work_dir is not None:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+        self.run_paths = []
+        self.batch = []